@@ -2,7 +2,17 @@
 
 __version__ = "0.2.0"
 
-from .llm import LLMClient
-from .config import Config
-
 __all__ = ["LLMClient", "Config", "__version__"]
+
+
+def __getattr__(name):
+    # 延迟导入，避免 `cheapllm --help` 等命令加载用不到的模块
+    if name == "LLMClient":
+        from .llm import LLMClient
+
+        return LLMClient
+    if name == "Config":
+        from .config import Config
+
+        return Config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,139 @@
+"""
+LLM 回复缓存
+相同的单轮问答直接复用之前的回复（内存 LRU + SQLite 持久化）
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+# 默认缓存文件与过期时间（秒）
+DEFAULT_CACHE_FILE = Path.home() / ".cheapllm" / "cache.sqlite"
+DEFAULT_TTL = 7 * 24 * 3600
+
+
+class ResponseCache:
+    """回复缓存
+
+    先查进程内的 LRU，再查磁盘上的 SQLite 数据库；超过 ttl 的记录视为失效，
+    写入时顺带清理。缓存读写失败不会影响正常请求。
+
+    用法:
+        cache = ResponseCache()
+        key = ResponseCache.make_key(base_url, model, question)
+        reply = cache.get(key)
+        if reply is None:
+            reply = ...
+            cache.set(key, reply)
+    """
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_FILE,
+        ttl: int = DEFAULT_TTL,
+        memory_size: int = 128,
+    ):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """根据请求参数生成缓存键"""
+        return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+    def _connect(self):
+        """按需打开数据库（调用方需持有锁）"""
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, response TEXT, ts INTEGER)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_ts ON responses (ts)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存，不存在或已过期时返回 None"""
+        now = int(time.time())
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    return entry[1]
+                del self._memory[key]
+            try:
+                row = (
+                    self._connect()
+                    .execute("SELECT response, ts FROM responses WHERE key = ?", (key,))
+                    .fetchone()
+                )
+            except (sqlite3.Error, OSError):
+                return None
+            if row is None or now - row[1] > self.ttl:
+                return None
+            self._remember(key, row[1], row[0])
+            return row[0]
+
+    def set(self, key: str, response: str):
+        """写入缓存，并清理过期记录"""
+        now = int(time.time())
+        with self._lock:
+            self._remember(key, now, response)
+            try:
+                db = self._connect()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, ts) VALUES (?, ?, ?)",
+                    (key, response, now),
+                )
+                db.execute("DELETE FROM responses WHERE ts < ?", (now - self.ttl,))
+                db.commit()
+            except (sqlite3.Error, OSError):
+                pass
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._memory.clear()
+            try:
+                db = self._connect()
+                db.execute("DELETE FROM responses")
+                db.commit()
+            except (sqlite3.Error, OSError):
+                pass
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: str, ts: int, response: str):
+        """写入内存 LRU（调用方需持有锁）"""
+        self._memory[key] = (ts, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+_default_cache: Optional[ResponseCache] = None
+
+
+def get_default_cache() -> ResponseCache:
+    """返回进程内共享的默认缓存（~/.cheapllm/cache.sqlite）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ResponseCache()
+    return _default_cache
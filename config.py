@@ -4,6 +4,7 @@
 """
 
 import json
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, Any, Optional
 from .styles import StyleManager
@@ -16,12 +17,32 @@ DEFAULT_API_CONFIG = {
     "temperature": 0.7,
     "max_tokens": 2048,
     "system_prompt": "你是一个有用的AI助手。",
+    "max_history_turns": 20,
 }
 
+# 本进程中已确认存在的配置目录
+_READY_DIRS = set()
+
+
+@lru_cache(maxsize=8)
+def _load_cached(path: str, mtime_ns: int, size: int) -> Dict[str, Any]:
+    """读取并合并配置文件，按 (路径, 修改时间, 大小) 缓存
+
+    调用方需自行拷贝返回值，不能直接修改缓存中的字典。
+    """
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        # 用默认值补全缺失的字段
+        return {**DEFAULT_API_CONFIG, **data}
+    except (json.JSONDecodeError, OSError):
+        return dict(DEFAULT_API_CONFIG)
+
 
 class Config:
     """用户配置管理"""
 
+    __slots__ = ("config_dir", "config_file", "styles_dir")
+
     def __init__(self):
         self.config_dir = Path.home() / ".cheapllm"
         self.config_file = self.config_dir / "config.json"
@@ -29,29 +50,32 @@ class Config:
         self._ensure_dirs()
 
     def _ensure_dirs(self):
-        """确保配置目录存在"""
+        """确保配置目录存在（每个进程只检查一次）"""
+        if self.config_dir in _READY_DIRS:
+            return
         self.config_dir.mkdir(parents=True, exist_ok=True)
         self.styles_dir.mkdir(parents=True, exist_ok=True)
+        _READY_DIRS.add(self.config_dir)
 
     # ── API 配置 ──────────────────────────────────────────
 
     def load(self) -> Dict[str, Any]:
-        """加载完整配置"""
-        if self.config_file.exists():
-            try:
-                data = json.loads(self.config_file.read_text(encoding="utf-8"))
-                # 用默认值补全缺失的字段
-                merged = {**DEFAULT_API_CONFIG, **data}
-                return merged
-            except (json.JSONDecodeError, OSError):
-                pass
-        return dict(DEFAULT_API_CONFIG)
+        """加载完整配置
+
+        配置文件未修改时直接返回缓存结果，避免重复读盘和解析。
+        """
+        try:
+            stat = self.config_file.stat()
+        except OSError:
+            return dict(DEFAULT_API_CONFIG)
+        return dict(_load_cached(str(self.config_file), stat.st_mtime_ns, stat.st_size))
 
     def save(self, data: Dict[str, Any]):
         """保存完整配置"""
         self.config_file.write_text(
             json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8"
         )
+        _load_cached.cache_clear()
 
     def get(self, key: str, default: Any = None) -> Any:
         """获取单个配置项"""
@@ -60,15 +84,24 @@ class Config:
 
     def set(self, key: str, value: Any):
         """设置单个配置项"""
+        self.update({key: value})
+
+    def update(self, patch: Dict[str, Any]):
+        """批量设置配置项（只读写一次配置文件）"""
         data = self.load()
-        # 自动转换类型
-        if key in ("temperature",):
-            value = float(value)
-        elif key in ("max_tokens",):
-            value = int(value)
-        data[key] = value
+        for key, value in patch.items():
+            data[key] = self._coerce(key, value)
         self.save(data)
 
+    @staticmethod
+    def _coerce(key: str, value: Any) -> Any:
+        """按配置项自动转换类型"""
+        if key in ("temperature",):
+            return float(value)
+        if key in ("max_tokens", "max_history_turns"):
+            return int(value)
+        return value
+
     def get_api_config(self) -> Dict[str, Any]:
         """获取 API 配置（用于创建 LLMClient）"""
         return self.load()
@@ -92,17 +125,9 @@ class Config:
         manager = StyleManager()
         styles = manager.list_styles()
 
-        for f in self.styles_dir.glob("*.json"):
-            if f.stem not in styles:
-                try:
-                    config = json.loads(f.read_text(encoding="utf-8"))
-                    styles[f.stem] = {
-                        "description": config.get("description", ""),
-                        "author": config.get("author", ""),
-                        "custom": True,
-                    }
-                except (json.JSONDecodeError, OSError):
-                    continue
+        for name, info in manager.scan_styles(self.styles_dir).items():
+            if name not in styles:
+                styles[name] = {**info, "custom": True}
 
         return styles
 
@@ -3,31 +3,78 @@
 根据风格配置生成 Prompt 模板和 Agent 类
 """
 
-import re
+import os
+from functools import lru_cache
 from pathlib import Path
-from jinja2 import Environment, FileSystemLoader
+from typing import List, Set, Tuple
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from .styles import StyleManager
 
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+# 模块级共享的模板环境，多次生成时复用已编译的模板
+_ENV = Environment(
+    loader=FileSystemLoader(str(TEMPLATE_DIR)),
+    trim_blocks=True,
+    lstrip_blocks=True,
+    cache_size=64,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(),
+)
+
+_STYLE_MANAGER = StyleManager()
+
+# 本进程中已创建过的输出目录
+_MKDIR_CACHE: Set[Path] = set()
+
+# to_class_name 中需要去掉的分隔符
+_CLASSNAME_STRIP = str.maketrans("", "", "_-")
+
 
 def to_class_name(name: str) -> str:
     """将名称转换为类名格式
 
     例如: my_chatbot -> MyChatbot
     """
-    return re.sub(r"[_-]", "", name.title())
+    return name.title().translate(_CLASSNAME_STRIP)
+
+
+@lru_cache(maxsize=32)
+def _get_template_cached(template_ref: str):
+    """按模板引用缓存模板对象（见 Generator._get_template）"""
+    if template_ref.endswith(".j2"):
+        return _ENV.get_template(template_ref)
+    return _ENV.from_string(template_ref)
+
+
+def _write_file(path: Path, code: str):
+    """写入生成的代码（UTF-8 编码，输出目录每个进程只创建一次）"""
+    parent = path.parent.resolve()
+    if parent not in _MKDIR_CACHE:
+        parent.mkdir(parents=True, exist_ok=True)
+        _MKDIR_CACHE.add(parent)
+    data = memoryview(code.encode("utf-8"))
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    try:
+        fd = os.open(path, flags, 0o666)
+    except FileNotFoundError:
+        # 目录在进程运行期间被删除，重新创建后再试一次
+        parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(path, flags, 0o666)
+    try:
+        while data:
+            data = data[os.write(fd, data) :]
+    finally:
+        os.close(fd)
 
 
 class Generator:
     """代码生成器"""
 
     def __init__(self, style_name: str = "default"):
-        self.style = StyleManager().get_style(style_name)
-        self.template_dir = Path(__file__).parent / "templates"
-        self.env = Environment(
-            loader=FileSystemLoader(str(self.template_dir)),
-            trim_blocks=True,
-            lstrip_blocks=True,
-        )
+        self.style = _STYLE_MANAGER.get_style(style_name)
+        self.template_dir = TEMPLATE_DIR
+        self.env = _ENV
 
     def _get_template(self, template_ref: str):
         """获取模板对象
@@ -41,9 +88,7 @@ class Generator:
         Returns:
             Jinja2 模板对象
         """
-        if template_ref.endswith(".j2"):
-            return self.env.get_template(template_ref)
-        return self.env.from_string(template_ref)
+        return _get_template_cached(template_ref)
 
     def generate_prompt(self, name: str, template: str, output: str = ".") -> str:
         """生成 Prompt 模板
@@ -56,7 +101,50 @@ class Generator:
         Returns:
             生成的文件路径
         """
+        output_file, code = self._render_prompt(name, template, Path(output))
+        _write_file(output_file, code)
+        return str(output_file)
+
+    def generate_agent(self, name: str, desc: str, output: str = ".") -> str:
+        """生成 Agent 类
+
+        Args:
+            name: Agent 名称
+            desc: Agent 描述
+            output: 输出目录路径
+
+        Returns:
+            生成的文件路径
+        """
+        output_file, code = self._render_agent(name, desc, Path(output))
+        _write_file(output_file, code)
+        return str(output_file)
+
+    def generate_many(self, specs: List[Tuple[str, str, str]], output: str = ".") -> List[str]:
+        """批量生成代码：先渲染全部模板，再依次写入文件
+
+        Args:
+            specs: (类型, 名称, 内容) 列表；类型为 "agent" 时内容是描述，
+                为 "prompt" 时内容是 Prompt 模板
+            output: 输出目录路径
+
+        Returns:
+            生成的文件路径列表，顺序与 specs 一致
+        """
         output_path = Path(output)
+        renderers = {"agent": self._render_agent, "prompt": self._render_prompt}
+        rendered = []
+        for kind, name, content in specs:
+            if kind not in renderers:
+                raise ValueError(f"未知的生成类型: {kind}")
+            rendered.append(renderers[kind](name, content, output_path))
+
+        for output_file, code in rendered:
+            _write_file(output_file, code)
+        return [str(output_file) for output_file, _ in rendered]
+
+    def _render_prompt(self, name: str, template: str, output_path: Path) -> Tuple[Path, str]:
+        """渲染 Prompt 模板，返回 (输出文件路径, 代码)"""
         naming = self.style.get("naming", {})
         file_name = naming.get("prompt", "{name}_prompt").format(name=name)
         if not file_name.endswith(".py"):
@@ -71,26 +159,10 @@ class Generator:
             docstring_style=self.style.get("docstring", "google"),
             comment_style=self.style.get("comment", "full"),
         )
+        return output_path / file_name, code
 
-        # 写入文件
-        output_file = output_path / file_name
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        output_file.write_text(code, encoding="utf-8")
-
-        return str(output_file)
-
-    def generate_agent(self, name: str, desc: str, output: str = ".") -> str:
-        """生成 Agent 类
-
-        Args:
-            name: Agent 名称
-            desc: Agent 描述
-            output: 输出目录路径
-
-        Returns:
-            生成的文件路径
-        """
-        output_path = Path(output)
+    def _render_agent(self, name: str, desc: str, output_path: Path) -> Tuple[Path, str]:
+        """渲染 Agent 类，返回 (输出文件路径, 代码)"""
         naming = self.style.get("naming", {})
         class_name = to_class_name(name)
         file_name = naming.get("file", "{name}.py").format(name=name)
@@ -107,10 +179,4 @@ class Generator:
             docstring_style=self.style.get("docstring", "google"),
             comment_style=self.style.get("comment", "full"),
         )
-
-        # 写入文件
-        output_file = output_path / file_name
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        output_file.write_text(code, encoding="utf-8")
-
-        return str(output_file)
+        return output_path / file_name, code
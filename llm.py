@@ -1,43 +1,252 @@
 """
 LLM API 客户端
 支持所有 OpenAI 兼容接口（OpenAI / DeepSeek / Ollama / 通义千问 等）
-使用 Python 标准库，零额外依赖
+使用 Python 标准库，零额外依赖（基于 http.client 的长连接池）
+安装 orjson 后自动用于请求/响应的 JSON 编解码
 """
 
+import asyncio
+import base64
+import functools
+import gzip
+import http.client
 import json
+import random
+import ssl
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import urllib.request
-import urllib.error
-from typing import Dict, List, Optional, Generator
-
-
-# 预设的常用模型服务商
-PROVIDERS = {
-    "openai": {
-        "base_url": "https://api.openai.com/v1",
-        "model": "gpt-3.5-turbo",
-        "description": "OpenAI 官方 API",
-    },
-    "deepseek": {
-        "base_url": "https://api.deepseek.com/v1",
-        "model": "deepseek-chat",
-        "description": "DeepSeek（性价比高）",
-    },
-    "ollama": {
-        "base_url": "http://localhost:11434/v1",
-        "model": "qwen2.5",
-        "description": "Ollama 本地模型（免费）",
-    },
-    "zhipu": {
-        "base_url": "https://open.bigmodel.cn/api/paas/v4",
-        "model": "glm-4-flash",
-        "description": "智谱 AI（GLM 系列）",
-    },
-    "siliconflow": {
-        "base_url": "https://api.siliconflow.cn/v1",
-        "model": "Qwen/Qwen2.5-7B-Instruct",
-        "description": "SiliconFlow（多模型聚合，有免费额度）",
-    },
-}
+from typing import Dict, List, Optional, Generator, Tuple
+from urllib.parse import unquote, urlsplit
+
+try:
+    import orjson
+
+    _dumps = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # 未安装 orjson 时回退到标准库
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    _loads = json.loads
+
+
+# 建立连接与等待响应的超时（秒）
+CONNECT_TIMEOUT = 10
+DEFAULT_TIMEOUT = 120
+
+# 失败重试：最大重试次数、可重试的状态码、退避基数与最长等待（秒）
+MAX_RETRIES = 3
+RETRY_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+RETRY_BACKOFF = 0.5
+RETRY_MAX_DELAY = 60.0
+
+# 流式输出每累计多少字节或多少个片段刷新一次
+STREAM_FLUSH_BYTES = 256
+STREAM_FLUSH_CHUNKS = 8
+
+# 默认随请求发送的最近对话轮数
+DEFAULT_MAX_HISTORY_TURNS = 20
+
+_SYSTEM = "system"
+_USER = "user"
+_ASSISTANT = "assistant"
+
+_SSE_DATA = b"data: "
+_SSE_DONE = b"[DONE]"
+
+
+class _ConnectionPool:
+    """HTTP 长连接池
+
+    按 (scheme, host, port) 缓存空闲连接，连续请求同一服务地址时复用
+    TCP/TLS 连接，省去每次请求的握手开销。
+    """
+
+    def __init__(self, maxsize: int = 32):
+        self.maxsize = maxsize
+        self._idle: Dict[Tuple[str, str, int], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str, int]) -> Tuple[http.client.HTTPConnection, bool]:
+        """取出一个连接，返回 (连接, 是否为复用的旧连接)"""
+        with self._lock:
+            conns = self._idle.get(key)
+            if conns:
+                return conns.pop(), True
+        return _open_connection(*key), False
+
+    def put(self, key: Tuple[str, str, int], conn: http.client.HTTPConnection):
+        """归还连接，池满则直接关闭"""
+        with self._lock:
+            conns = self._idle.setdefault(key, [])
+            if len(conns) < self.maxsize:
+                conns.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+def _get_proxy(scheme: str, host: str):
+    """读取 HTTP(S)_PROXY 环境变量，返回代理地址（不走代理时为 None）"""
+    proxy = urllib.request.getproxies().get(scheme)
+    if not proxy or urllib.request.proxy_bypass(host):
+        return None
+    return urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+
+
+def _proxy_headers(proxy) -> Dict[str, str]:
+    """代理地址带用户名密码时，生成 Basic 认证的 Proxy-Authorization 头"""
+    if not proxy.username:
+        return {}
+    user_pass = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+    token = base64.b64encode(user_pass.encode("utf-8")).decode("ascii")
+    return {"Proxy-Authorization": f"Basic {token}"}
+
+
+def _open_connection(scheme: str, host: str, port: int) -> http.client.HTTPConnection:
+    """创建新连接，HTTPS 经代理时通过 CONNECT 隧道"""
+    conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+    proxy = _get_proxy(scheme, host)
+    if proxy is None:
+        return conn_cls(host, port, timeout=CONNECT_TIMEOUT)
+    conn = conn_cls(proxy.hostname, proxy.port or 80, timeout=CONNECT_TIMEOUT)
+    if scheme == "https":
+        conn.set_tunnel(host, port, headers=_proxy_headers(proxy))
+    return conn
+
+
+class _ConnectError(OSError):
+    """建立连接失败，请求尚未发出，可以安全重试"""
+
+
+# 建立连接时不会因重试而好转的错误（如证书校验失败）
+_PERMANENT_CONNECT_ERRORS = (ssl.CertificateError,)
+
+
+# 空闲连接已被服务端关闭时会出现的错误，只有这些情况才换连接重发
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# 进程内共享的连接池
+_POOL = _ConnectionPool()
+
+
+def close_pool():
+    """关闭进程内共享连接池中的全部空闲连接
+
+    连接池由所有 LLMClient 共用，关闭后各客户端的下一次请求会重新建立连接；
+    正在进行中的请求不受影响。一般只在程序退出或长时间空闲前调用。
+    """
+    _POOL.close()
+
+
+@functools.lru_cache(maxsize=32)
+def _payload_tail(model: str, temperature: float, max_tokens: int, stream: bool) -> bytes:
+    """预先序列化请求体中除 messages 以外的固定部分（以 "," 开头，"}" 结尾）"""
+    fixed = _dumps(
+        {"model": model, "temperature": temperature, "max_tokens": max_tokens, "stream": stream}
+    )
+    return b"," + fixed[1:]
+
+
+def _release(key: Tuple[str, str, int], conn: http.client.HTTPConnection, resp):
+    """只有完整读完响应的连接才放回连接池"""
+    if resp.isclosed() and not resp.will_close:
+        _POOL.put(key, conn)
+    else:
+        conn.close()
+
+
+def _backoff(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间（指数退避 + 随机抖动）"""
+    return min(RETRY_MAX_DELAY, RETRY_BACKOFF * 2**attempt + random.random() * RETRY_BACKOFF)
+
+
+def _retry_after(resp: http.client.HTTPResponse) -> Optional[float]:
+    """解析 Retry-After 响应头（秒数形式），不存在或无法解析时返回 None"""
+    value = resp.getheader("Retry-After")
+    try:
+        return min(RETRY_MAX_DELAY, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _read_body(resp: http.client.HTTPResponse) -> bytes:
+    """读取完整响应体，按需解压 gzip"""
+    body = resp.read()
+    if resp.getheader("Content-Encoding", "").lower() == "gzip":
+        body = gzip.decompress(body)
+    return body
+
+
+class _StreamWriter:
+    """流式输出的写缓冲
+
+    直接写入 stream 底层的字节缓冲区，遇到换行、累计超过 STREAM_FLUSH_BYTES
+    字节或每写入 STREAM_FLUSH_CHUNKS 个片段时 flush，结束时由调用方再 flush 一次。
+    stream 没有字节缓冲区（如 io.StringIO）时退回按文本写入。
+    """
+
+    def __init__(self, stream):
+        stream.flush()  # 先刷出文本层已缓冲的内容，保证输出顺序
+        self._stream = stream
+        self._buffer = getattr(stream, "buffer", None)
+        self._encoding = getattr(stream, "encoding", None) or "utf-8"
+        self._pending = 0
+        self._chunks = 0
+
+    def write(self, text: str):
+        if self._buffer is not None:
+            data = text.encode(self._encoding, errors="replace")
+            self._buffer.write(data)
+            self._pending += len(data)
+        else:
+            self._stream.write(text)
+            self._pending += len(text)
+        self._chunks += 1
+        if (
+            "\n" in text
+            or self._pending >= STREAM_FLUSH_BYTES
+            or self._chunks >= STREAM_FLUSH_CHUNKS
+        ):
+            self.flush()
+
+    def flush(self):
+        (self._buffer if self._buffer is not None else self._stream).flush()
+        self._pending = 0
+        self._chunks = 0
+
+
+def _get_reply_cache():
+    """返回默认的回复缓存；Python 未编译 sqlite3 模块时返回 None（不使用缓存）"""
+    try:
+        from .cache import get_default_cache
+    except ImportError:
+        return None
+    return get_default_cache()
+
+
+def __getattr__(name):
+    # 兼容旧代码的 `from cheapllm.llm import PROVIDERS`
+    if name == "PROVIDERS":
+        from .providers import PROVIDERS
+
+        return PROVIDERS
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class LLMClient:
@@ -51,6 +260,18 @@ class LLMClient:
         print(reply)
     """
 
+    __slots__ = (
+        "api_key",
+        "base_url",
+        "model",
+        "temperature",
+        "max_tokens",
+        "system_prompt",
+        "max_history_turns",
+        "max_retries",
+        "history",
+    )
+
     def __init__(
         self,
         api_key: str = "",
@@ -59,87 +280,176 @@ class LLMClient:
         temperature: float = 0.7,
         max_tokens: int = 2048,
         system_prompt: str = "",
+        max_history_turns: Optional[int] = DEFAULT_MAX_HISTORY_TURNS,
+        max_retries: int = MAX_RETRIES,
     ):
+        if max_history_turns is not None and max_history_turns < 0:
+            raise ValueError(f"max_history_turns 不能为负数: {max_history_turns}")
         self.api_key = api_key
         self.base_url = base_url.rstrip("/")
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.system_prompt = system_prompt
+        self.max_history_turns = max_history_turns
+        self.max_retries = max_retries
         self.history: List[Dict[str, str]] = []
 
         if system_prompt:
-            self.history.append({"role": "system", "content": system_prompt})
+            self.history.append({"role": _SYSTEM, "content": system_prompt})
 
     def _build_messages(self, user_input: str) -> List[Dict[str, str]]:
-        """构建消息列表"""
-        messages = list(self.history)
-        messages.append({"role": "user", "content": user_input})
-        return messages
+        """构建消息列表
+
+        只携带系统提示词和最近 max_history_turns 轮对话（None 表示不限制），
+        避免长对话的请求体无限增长。
+        """
+        history = self.history
+        limit = self.max_history_turns
+        if limit is not None:
+            start = 1 if history and history[0]["role"] == _SYSTEM else 0
+            if len(history) - start > 2 * limit:
+                history = history[:start] + history[len(history) - 2 * limit :]
+        return history + [{"role": _USER, "content": user_input}]
 
     def _call_api(self, messages: List[Dict[str, str]], stream: bool = False) -> dict:
         """调用 Chat Completions API"""
         url = f"{self.base_url}/chat/completions"
-        payload = {
-            "model": self.model,
-            "messages": messages,
-            "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
-            "stream": stream,
-        }
-
-        data = json.dumps(payload).encode("utf-8")
+        data = (
+            b'{"messages":'
+            + _dumps(messages)
+            + _payload_tail(self.model, self.temperature, self.max_tokens, stream)
+        )
         headers = {
             "Content-Type": "application/json",
         }
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
+        if not stream:
+            # 流式响应需逐行实时读取，只对普通响应启用压缩
+            headers["Accept-Encoding"] = "gzip"
 
-        req = urllib.request.Request(url, data=data, headers=headers, method="POST")
-
+        key, conn, resp = self._send_with_retry(url, data, headers)
         try:
-            with urllib.request.urlopen(req, timeout=120) as resp:
-                if stream:
-                    return self._handle_stream(resp)
-                body = resp.read().decode("utf-8")
-                return json.loads(body)
-        except urllib.error.HTTPError as e:
-            error_body = e.read().decode("utf-8", errors="replace")
+            if resp.status >= 400:
+                error_body = _read_body(resp).decode("utf-8", errors="replace")
+                try:
+                    error_json = json.loads(error_body)
+                    error_msg = error_json.get("error", {}).get("message", error_body)
+                except json.JSONDecodeError:
+                    error_msg = error_body
+                raise RuntimeError(f"API 请求失败 (HTTP {resp.status}): {error_msg}")
+            if stream:
+                result = self._handle_stream(resp)
+                resp.read()  # 读完剩余数据，连接才能复用
+                return result
+            return _loads(_read_body(resp))
+        finally:
+            _release(key, conn, resp)
+
+    def _send_with_retry(self, url: str, data: bytes, headers: Dict[str, str]):
+        """发送请求，连接失败或遇到可重试的状态码时按指数退避重试
+
+        只重试请求确定没有送达的情况（建立连接失败，证书校验失败除外）和
+        服务端明确返回的可重试状态码；读取超时等请求可能已送达的错误不重试，
+        避免重复计费。
+        重试只发生在读取响应内容之前，流式输出不会重复。
+        """
+        max_retries = max(0, self.max_retries)
+        for attempt in range(max_retries + 1):
+            last_attempt = attempt == max_retries
             try:
-                error_json = json.loads(error_body)
-                error_msg = error_json.get("error", {}).get("message", error_body)
-            except json.JSONDecodeError:
-                error_msg = error_body
-            raise RuntimeError(f"API 请求失败 (HTTP {e.code}): {error_msg}") from e
-        except urllib.error.URLError as e:
-            raise RuntimeError(
-                f"无法连接到 API 服务器 ({self.base_url}): {e.reason}\n"
-                f"请检查: 1) 网络连接 2) base_url 是否正确 3) 如果用 Ollama 请确认服务已启动"
-            ) from e
+                key, conn, resp = self._send(url, data, headers)
+            except http.client.InvalidURL as e:
+                raise RuntimeError(f"无法连接到 API 服务器 ({self.base_url}): {e}") from e
+            except _ConnectError as e:
+                if last_attempt or isinstance(e.__cause__, _PERMANENT_CONNECT_ERRORS):
+                    raise RuntimeError(
+                        f"无法连接到 API 服务器 ({self.base_url}): {e}\n"
+                        f"请检查: 1) 网络连接 2) base_url 是否正确 3) 如果用 Ollama 请确认服务已启动"
+                    ) from e
+                time.sleep(_backoff(attempt))
+                continue
+            except (http.client.HTTPException, OSError) as e:
+                raise RuntimeError(f"API 请求失败，未收到响应 ({self.base_url}): {e}") from e
+
+            if resp.status not in RETRY_STATUS or last_attempt:
+                return key, conn, resp
+            delay = _retry_after(resp)
+            resp.read()
+            _release(key, conn, resp)
+            time.sleep(_backoff(attempt) if delay is None else delay)
+
+    def _send(self, url: str, data: bytes, headers: Dict[str, str]):
+        """通过连接池发送 POST 请求
+
+        复用的空闲连接可能已被服务端关闭，此时换一个连接重发；
+        其他错误（如读取超时）说明请求可能已送达，直接抛出，不重发。
+
+        Returns:
+            (连接池键, 连接, 响应) 三元组
+        """
+        parts = urlsplit(url)
+        scheme = parts.scheme
+        if scheme not in ("http", "https") or not parts.hostname:
+            raise http.client.InvalidURL(f"无效的 API 地址: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname, port)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+        proxy = _get_proxy(scheme, parts.hostname) if scheme == "http" else None
+        if proxy is not None:
+            # 经 HTTP 代理时请求行使用完整 URL，代理认证信息随请求头发送
+            target = url
+            headers = {**headers, **_proxy_headers(proxy)}
+
+        while True:
+            conn, reused = _POOL.get(key)
+            if not reused:
+                try:
+                    conn.connect()
+                except OSError as e:
+                    conn.close()
+                    raise _ConnectError(str(e)) from e
+                # 连接建立后改用较长的读取超时
+                conn.timeout = DEFAULT_TIMEOUT
+                conn.sock.settimeout(DEFAULT_TIMEOUT)
+            try:
+                conn.request("POST", target, body=data, headers=headers)
+                return key, conn, conn.getresponse()
+            except _STALE_CONNECTION_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                raise
 
     def _handle_stream(self, resp) -> dict:
-        """处理流式响应，实时输出并收集完整回复"""
-        full_content = ""
-        for line in resp:
-            line = line.decode("utf-8").strip()
-            if not line or not line.startswith("data: "):
+        """处理流式响应，实时输出并收集完整回复
+
+        直接在字节层面解析 SSE 行，输出经 _StreamWriter 合并后再刷新。
+        """
+        parts: List[str] = []
+        out = _StreamWriter(sys.stdout)
+        for raw in resp:
+            if not raw.startswith(_SSE_DATA):
                 continue
-            data_str = line[6:]
-            if data_str == "[DONE]":
+            payload = raw[6:].strip()
+            if payload == _SSE_DONE:
                 break
             try:
-                chunk = json.loads(data_str)
-                delta = chunk["choices"][0].get("delta", {})
-                content = delta.get("content", "")
-                if content:
-                    print(content, end="", flush=True)
-                    full_content += content
-            except (json.JSONDecodeError, KeyError, IndexError):
+                chunk = _loads(payload)
+                content = chunk["choices"][0].get("delta", {}).get("content", "")
+            except (ValueError, KeyError, IndexError):
                 continue
-        print()  # 换行
-        return {
-            "choices": [{"message": {"role": "assistant", "content": full_content}}]
-        }
+            if content:
+                out.write(content)
+                parts.append(content)
+        out.write("\n")  # 换行
+        out.flush()
+        return {"choices": [{"message": {"role": _ASSISTANT, "content": "".join(parts)}}]}
 
     def chat(self, user_input: str, stream: bool = True) -> str:
         """发送消息并获取回复
@@ -157,34 +467,91 @@ class LLMClient:
         reply = result["choices"][0]["message"]["content"]
 
         # 保存到历史记录
-        self.history.append({"role": "user", "content": user_input})
-        self.history.append({"role": "assistant", "content": reply})
+        self.history.extend([messages[-1], {"role": _ASSISTANT, "content": reply}])
 
         return reply
 
-    def ask(self, question: str, stream: bool = True) -> str:
+    def ask(self, question: str, stream: bool = True, use_cache: Optional[bool] = None) -> str:
         """单轮问答（不保留历史记录）
 
         Args:
             question: 问题
             stream: 是否流式输出
+            use_cache: 是否复用相同问题的缓存回复（仅非流式时生效），
+                默认在 temperature 为 0 时启用
 
         Returns:
             回复文本
         """
+        if use_cache is None:
+            use_cache = self.temperature == 0
+        cache = _get_reply_cache() if use_cache and not stream else None
+        if cache is not None:
+            key = cache.make_key(
+                self.base_url,
+                self.model,
+                self.temperature,
+                self.max_tokens,
+                self.system_prompt,
+                question,
+            )
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
         messages = []
         if self.system_prompt:
-            messages.append({"role": "system", "content": self.system_prompt})
-        messages.append({"role": "user", "content": question})
+            messages.append({"role": _SYSTEM, "content": self.system_prompt})
+        messages.append({"role": _USER, "content": question})
 
         result = self._call_api(messages, stream=stream)
-        return result["choices"][0]["message"]["content"]
+        reply = result["choices"][0]["message"]["content"]
+        if cache is not None:
+            cache.set(key, reply)
+        return reply
+
+    async def achat(self, user_input: str) -> str:
+        """chat 的异步版本（非流式）
+
+        在线程池中执行请求，不阻塞事件循环。同一客户端的多轮对话请依次 await，
+        不要并发调用，以免历史记录错乱。
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self.chat, user_input, stream=False)
+        )
+
+    async def aask(self, question: str) -> str:
+        """ask 的异步版本（非流式）"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.ask, question, stream=False))
+
+    async def abatch(self, prompts: List[str], concurrency: int = 8) -> List[str]:
+        """并发执行多个单轮问答（不保留历史记录）
+
+        Args:
+            prompts: 问题列表
+            concurrency: 最大并发请求数（按服务商限流调整）
+
+        Returns:
+            回复列表，顺序与 prompts 一致
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        try:
+            futures = [
+                loop.run_in_executor(executor, functools.partial(self.ask, p, stream=False))
+                for p in prompts
+            ]
+            return list(await asyncio.gather(*futures))
+        finally:
+            executor.shutdown(wait=False)
 
     def clear_history(self):
         """清空对话历史"""
         self.history = []
         if self.system_prompt:
-            self.history.append({"role": "system", "content": self.system_prompt})
+            self.history.append({"role": _SYSTEM, "content": self.system_prompt})
 
     @classmethod
     def from_config(cls, config: dict) -> "LLMClient":
@@ -195,5 +562,6 @@ class LLMClient:
             model=config.get("model", "gpt-3.5-turbo"),
             temperature=config.get("temperature", 0.7),
             max_tokens=config.get("max_tokens", 2048),
+            max_history_turns=config.get("max_history_turns", DEFAULT_MAX_HISTORY_TURNS),
             system_prompt=config.get("system_prompt", ""),
         )
@@ -1,11 +1,48 @@
 """风格管理器"""
 
+import copy
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .default import default_style
 
 
+def _mtime_ns(path: Path) -> Optional[int]:
+    """返回文件或目录的修改时间，不存在时返回 None"""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+@lru_cache(maxsize=32)
+def _load_style(path: str, mtime_ns: int) -> Optional[Dict[str, Any]]:
+    """读取风格文件，按 (路径, 修改时间) 缓存；无法解析时返回 None"""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (json.JSONDecodeError, OSError):
+        return None
+
+
+@lru_cache(maxsize=8)
+def _scan_styles(directory: str, mtime_ns: int) -> Dict[str, Dict[str, str]]:
+    """扫描目录下的 JSON 风格文件，按 (目录, 目录修改时间) 缓存
+
+    目录修改时间只在增删文件时变化，原地修改文件内容需重新启动进程才能看到。
+    """
+    styles = {}
+    for f in sorted(Path(directory).glob("*.json")):
+        config = _load_style(str(f), _mtime_ns(f) or 0)
+        if config is None:
+            continue
+        styles[f.stem] = {
+            "description": config.get("description", ""),
+            "author": config.get("author", ""),
+        }
+    return styles
+
+
 class StyleManager:
     """风格配置管理器 - 统一管理内置风格和 JSON 风格文件"""
 
@@ -19,18 +56,18 @@ class StyleManager:
             name: 风格名称
 
         Returns:
-            风格配置字典
+            风格配置字典（JSON 风格返回缓存结果的副本，可直接修改）
         """
         if name == "default":
             return default_style
 
         # 尝试从 JSON 文件加载
         style_file = self.styles_dir / f"{name}.json"
-        if style_file.exists():
-            try:
-                return json.loads(style_file.read_text(encoding="utf-8"))
-            except (json.JSONDecodeError, OSError):
-                pass
+        mtime_ns = _mtime_ns(style_file)
+        if mtime_ns is not None:
+            style = _load_style(str(style_file), mtime_ns)
+            if style is not None:
+                return copy.deepcopy(style)
 
         # 找不到指定风格时回退到默认风格
         return default_style
@@ -49,15 +86,23 @@ class StyleManager:
         }
 
         # 扫描 JSON 风格文件
-        for f in self.styles_dir.glob("*.json"):
-            if f.stem != "default":
-                try:
-                    config = json.loads(f.read_text(encoding="utf-8"))
-                    styles[f.stem] = {
-                        "description": config.get("description", ""),
-                        "author": config.get("author", ""),
-                    }
-                except (json.JSONDecodeError, OSError):
-                    continue
+        for name, info in self.scan_styles(self.styles_dir).items():
+            if name != "default":
+                styles[name] = info
 
         return styles
+
+    @staticmethod
+    def scan_styles(directory: Path) -> Dict[str, Dict]:
+        """扫描目录下的 JSON 风格文件（目录未变化时复用上次结果）
+
+        Args:
+            directory: 风格文件目录
+
+        Returns:
+            风格名称到描述信息的映射（每次返回新的字典，可直接修改）
+        """
+        mtime_ns = _mtime_ns(directory)
+        if mtime_ns is None:
+            return {}
+        return {name: dict(info) for name, info in _scan_styles(str(directory), mtime_ns).items()}
@@ -0,0 +1,38 @@
+"""
+预设的 LLM 服务商
+仅在 init / config providers 等命令中按需导入
+"""
+
+from types import MappingProxyType
+
+# 预设的常用模型服务商
+_PROVIDERS = {
+    "openai": {
+        "base_url": "https://api.openai.com/v1",
+        "model": "gpt-3.5-turbo",
+        "description": "OpenAI 官方 API",
+    },
+    "deepseek": {
+        "base_url": "https://api.deepseek.com/v1",
+        "model": "deepseek-chat",
+        "description": "DeepSeek（性价比高）",
+    },
+    "ollama": {
+        "base_url": "http://localhost:11434/v1",
+        "model": "qwen2.5",
+        "description": "Ollama 本地模型（免费）",
+    },
+    "zhipu": {
+        "base_url": "https://open.bigmodel.cn/api/paas/v4",
+        "model": "glm-4-flash",
+        "description": "智谱 AI（GLM 系列）",
+    },
+    "siliconflow": {
+        "base_url": "https://api.siliconflow.cn/v1",
+        "model": "Qwen/Qwen2.5-7B-Instruct",
+        "description": "SiliconFlow（多模型聚合，有免费额度）",
+    },
+}
+
+# 只读视图，防止调用方误改预设
+PROVIDERS = MappingProxyType({name: MappingProxyType(info) for name, info in _PROVIDERS.items()})
@@ -0,0 +1,79 @@
+"""测试共用的本地 HTTP 服务（模拟 OpenAI 兼容 API）"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cheapllm import llm
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server.posts.append(body)
+        server.requests.append((self.path, self.headers))
+        server.clients.add(self.client_address)
+        action = server.actions.pop(0) if server.actions else "ok"
+
+        if action == "stall":
+            # 收下请求后迟迟不回复
+            time.sleep(server.stall)
+            self.close_connection = True
+            return
+
+        if action == "busy":
+            status, out = 503, {"error": {"message": "busy"}}
+        else:
+            reply = "echo:" + body["messages"][-1]["content"]
+            status, out = 200, {"choices": [{"message": {"role": "assistant", "content": reply}}]}
+        data = json.dumps(out).encode("utf-8")
+        self.send_response(status)
+        if action == "busy":
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        if action == "drop":
+            # 不告知客户端就关闭连接，模拟空闲连接被服务端回收
+            self.close_connection = True
+
+    def do_CONNECT(self):
+        # 作为需要认证的代理，记录隧道请求后拒绝
+        self.server.requests.append((self.path, self.headers))
+        self.send_response(407)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+        self.close_connection = True
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    httpd.block_on_close = False
+    httpd.posts = []
+    httpd.requests = []
+    httpd.clients = set()
+    httpd.actions = []
+    httpd.stall = 1.0
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_pool(monkeypatch):
+    monkeypatch.setattr(llm, "_POOL", llm._ConnectionPool())
+    monkeypatch.setattr(llm, "DEFAULT_TIMEOUT", 0.3)
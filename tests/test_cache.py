@@ -0,0 +1,97 @@
+"""ask() 回复缓存测试"""
+
+import asyncio
+import sys
+import time
+import types
+
+import pytest
+
+from cheapllm import cache as cache_module
+from cheapllm import llm
+
+
+@pytest.fixture(autouse=True)
+def reply_cache(tmp_path, monkeypatch):
+    """每个测试使用临时目录下的独立缓存"""
+    cache = cache_module.ResponseCache(tmp_path / "cache.sqlite")
+    monkeypatch.setattr(cache_module, "_default_cache", cache)
+    yield cache
+    cache.close()
+
+
+def _client(server, **kwargs) -> llm.LLMClient:
+    host, port = server.server_address
+    kwargs.setdefault("temperature", 0)
+    return llm.LLMClient(base_url=f"http://{host}:{port}/v1", **kwargs)
+
+
+def test_cache_hit_skips_network(server):
+    client = _client(server)
+    assert client.ask("a", stream=False) == "echo:a"
+    assert client.ask("a", stream=False) == "echo:a"
+    assert len(server.posts) == 1
+
+
+def test_cache_survives_new_process(server, reply_cache, monkeypatch):
+    client = _client(server)
+    client.ask("a", stream=False)
+    # 新的缓存对象没有内存 LRU，只能从 SQLite 读到
+    fresh = cache_module.ResponseCache(reply_cache.path)
+    monkeypatch.setattr(cache_module, "_default_cache", fresh)
+    assert client.ask("a", stream=False) == "echo:a"
+    assert len(server.posts) == 1
+    fresh.close()
+
+
+def test_expired_entry_is_refetched(server, reply_cache, monkeypatch):
+    client = _client(server)
+    clock = types.SimpleNamespace(time=time.time)
+    monkeypatch.setattr(cache_module, "time", clock)
+    client.ask("a", stream=False)
+    expired = time.time() + reply_cache.ttl + 1
+    clock.time = lambda: expired
+    client.ask("a", stream=False)
+    assert len(server.posts) == 2
+
+
+def test_use_cache_false_always_sends(server):
+    client = _client(server)
+    client.ask("a", stream=False)
+    client.ask("a", stream=False, use_cache=False)
+    assert len(server.posts) == 2
+
+
+def test_cache_off_by_default_when_temperature_nonzero(server):
+    client = _client(server, temperature=0.7)
+    client.ask("a", stream=False)
+    client.ask("a", stream=False)
+    assert len(server.posts) == 2
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [{"model": "other-model"}, {"system_prompt": "你是助手"}, {"max_tokens": 16}],
+)
+def test_cache_key_depends_on_request_options(server, changes):
+    _client(server).ask("a", stream=False)
+    _client(server, **changes).ask("a", stream=False)
+    assert len(server.posts) == 2
+
+
+def test_cache_shared_across_abatch_threads(server):
+    client = _client(server)
+    prompts = [f"q{i}" for i in range(16)]
+    expected = [f"echo:{p}" for p in prompts]
+    assert asyncio.run(client.abatch(prompts, concurrency=8)) == expected
+    assert asyncio.run(client.abatch(prompts, concurrency=8)) == expected
+    assert len(server.posts) == len(prompts)
+
+
+def test_missing_sqlite_falls_back_to_no_cache(server, monkeypatch):
+    # 模拟 Python 未编译 sqlite3：导入缓存模块失败
+    monkeypatch.setitem(sys.modules, "cheapllm.cache", None)
+    client = _client(server)
+    assert client.ask("a", stream=False) == "echo:a"
+    assert client.ask("a", stream=False) == "echo:a"
+    assert len(server.posts) == 2
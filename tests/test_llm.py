@@ -0,0 +1,232 @@
+"""LLMClient 连接池与重试行为测试（使用本地 HTTP 服务模拟 API）"""
+
+import base64
+import ssl
+
+import pytest
+
+from cheapllm import llm
+
+
+def _client(server, **kwargs) -> llm.LLMClient:
+    host, port = server.server_address
+    return llm.LLMClient(base_url=f"http://{host}:{port}/v1", **kwargs)
+
+
+def test_connection_is_reused(server):
+    client = _client(server)
+    assert client.ask("a", stream=False) == "echo:a"
+    assert client.ask("b", stream=False) == "echo:b"
+    assert len(server.posts) == 2
+    assert len(server.clients) == 1
+
+
+def test_stale_pooled_connection_is_resent(server):
+    client = _client(server, max_retries=0)
+    server.actions = ["drop"]
+    assert client.ask("a", stream=False) == "echo:a"
+    assert client.ask("b", stream=False) == "echo:b"
+    assert [p["messages"][-1]["content"] for p in server.posts] == ["a", "b"]
+
+
+def test_read_timeout_on_pooled_connection_is_not_resent(server):
+    client = _client(server, max_retries=0)
+    assert client.ask("a", stream=False) == "echo:a"
+    server.actions = ["stall"]
+    with pytest.raises(RuntimeError):
+        client.ask("b", stream=False)
+    assert [p["messages"][-1]["content"] for p in server.posts] == ["a", "b"]
+
+
+def test_read_timeout_is_not_retried(server):
+    client = _client(server)
+    server.actions = ["stall"]
+    with pytest.raises(RuntimeError):
+        client.ask("a", stream=False)
+    assert len(server.posts) == 1
+
+
+def test_connection_failure_is_retried(monkeypatch):
+    opened = []
+    open_connection = llm._open_connection
+
+    def counting_open(*key):
+        opened.append(key)
+        return open_connection(*key)
+
+    monkeypatch.setattr(llm, "_open_connection", counting_open)
+    monkeypatch.setattr(llm, "_backoff", lambda attempt: 0)
+    # 端口 1 上没有服务，连接会被拒绝
+    client = llm.LLMClient(base_url="http://127.0.0.1:1/v1", max_retries=2)
+    with pytest.raises(RuntimeError, match="无法连接"):
+        client.ask("a", stream=False)
+    assert len(opened) == 3
+
+
+def test_retryable_status_is_retried(server):
+    client = _client(server)
+    server.actions = ["busy", "busy"]
+    assert client.ask("a", stream=False) == "echo:a"
+    assert len(server.posts) == 3
+
+
+def test_negative_max_retries_sends_once(server):
+    client = _client(server, max_retries=-1)
+    assert client.ask("a", stream=False) == "echo:a"
+    server.actions = ["busy"]
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        client.ask("b", stream=False)
+    assert len(server.posts) == 2
+
+
+class _RecordingStream:
+    """记录 flush 时已写入内容的文本流"""
+
+    def __init__(self):
+        self.written = []
+        self.flushed = []
+
+    def write(self, text):
+        self.written.append(text)
+
+    def flush(self):
+        self.flushed.append("".join(self.written))
+
+
+def test_stream_writer_coalesces_flushes():
+    stream = _RecordingStream()
+    out = llm._StreamWriter(stream)
+    for _ in range(100):
+        out.write("a")
+    out.flush()
+    # 初始 flush + 每 STREAM_FLUSH_CHUNKS 个片段一次 + 结束时一次
+    assert len(stream.flushed) == 2 + 100 // llm.STREAM_FLUSH_CHUNKS
+    assert stream.flushed[-1] == "a" * 100
+
+
+def test_stream_writer_flushes_on_newline_and_size():
+    stream = _RecordingStream()
+    out = llm._StreamWriter(stream)
+    out.write("a")
+    out.write("b\n")
+    assert stream.flushed[-1] == "ab\n"
+    out.write("x" * llm.STREAM_FLUSH_BYTES)
+    assert stream.flushed[-1].endswith("x" * llm.STREAM_FLUSH_BYTES)
+
+
+def test_connected_socket_uses_read_timeout(server, monkeypatch):
+    monkeypatch.setattr(llm, "CONNECT_TIMEOUT", 5)
+    client = _client(server)
+    assert client.ask("a", stream=False) == "echo:a"
+    (conn,) = [c for conns in llm._POOL._idle.values() for c in conns]
+    assert conn.sock.gettimeout() == llm.DEFAULT_TIMEOUT
+
+
+def test_certificate_error_is_not_retried(monkeypatch):
+    opened = []
+
+    class _BadCertConnection:
+        def connect(self):
+            raise ssl.SSLCertVerificationError("certificate verify failed")
+
+        def close(self):
+            pass
+
+    def bad_cert_open(*key):
+        opened.append(key)
+        return _BadCertConnection()
+
+    monkeypatch.setattr(llm, "_open_connection", bad_cert_open)
+    monkeypatch.setattr(llm, "_backoff", lambda attempt: 0)
+    client = llm.LLMClient(base_url="https://api.example.com/v1")
+    with pytest.raises(RuntimeError, match="certificate verify failed"):
+        client.ask("a", stream=False)
+    assert len(opened) == 1
+
+
+@pytest.fixture
+def proxy_env(server, monkeypatch):
+    """把本地服务设为带认证的 HTTP(S) 代理"""
+    host, port = server.server_address
+    for name in ("no_proxy", "NO_PROXY", "http_proxy", "https_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    proxy = f"http://user:p%40ss@{host}:{port}"
+    monkeypatch.setenv("HTTP_PROXY", proxy)
+    monkeypatch.setenv("HTTPS_PROXY", proxy)
+    return "Basic " + base64.b64encode(b"user:p@ss").decode("ascii")
+
+
+def test_http_proxy_receives_credentials(server, proxy_env):
+    client = llm.LLMClient(base_url="http://api.example.com/v1")
+    assert client.ask("a", stream=False) == "echo:a"
+    path, headers = server.requests[0]
+    assert path == "http://api.example.com/v1/chat/completions"
+    assert headers["Proxy-Authorization"] == proxy_env
+
+
+def test_https_proxy_tunnel_receives_credentials(server, proxy_env):
+    client = llm.LLMClient(base_url="https://api.example.com/v1", max_retries=0)
+    with pytest.raises(RuntimeError, match="407"):
+        client.ask("a", stream=False)
+    path, headers = server.requests[0]
+    assert path == "api.example.com:443"
+    assert headers["Proxy-Authorization"] == proxy_env
+
+
+def test_close_pool_drops_idle_connections(server):
+    client = _client(server)
+    assert client.ask("a", stream=False) == "echo:a"
+    llm.close_pool()
+    assert client.ask("b", stream=False) == "echo:b"
+    assert len(server.clients) == 2
+
+
+def _sent_messages(server) -> list:
+    return [(m["role"], m["content"]) for m in server.posts[-1]["messages"]]
+
+
+@pytest.mark.parametrize("system_prompt", ["", "你是助手"])
+def test_history_window_keeps_recent_pairs(server, system_prompt):
+    client = _client(server, system_prompt=system_prompt, max_history_turns=2)
+    for question in ("q1", "q2", "q3", "q4"):
+        client.chat(question, stream=False)
+    expected = [("system", system_prompt)] if system_prompt else []
+    expected += [
+        ("user", "q2"),
+        ("assistant", "echo:q2"),
+        ("user", "q3"),
+        ("assistant", "echo:q3"),
+        ("user", "q4"),
+    ]
+    assert _sent_messages(server) == expected
+    # 完整历史仍保留在客户端
+    assert len(client.history) == (1 if system_prompt else 0) + 8
+
+
+def test_history_window_zero_sends_only_system_and_question(server):
+    client = _client(server, system_prompt="你是助手", max_history_turns=0)
+    client.chat("q1", stream=False)
+    client.chat("q2", stream=False)
+    assert _sent_messages(server) == [("system", "你是助手"), ("user", "q2")]
+
+
+def test_history_window_none_sends_everything(server):
+    client = _client(server, max_history_turns=None)
+    for question in ("q1", "q2", "q3"):
+        client.chat(question, stream=False)
+    assert [role for role, _ in _sent_messages(server)] == ["user", "assistant"] * 2 + ["user"]
+
+
+def test_history_stays_aligned_after_failed_turn(server):
+    client = _client(server, max_history_turns=1, max_retries=0)
+    client.chat("q1", stream=False)
+    server.actions = ["busy"]
+    with pytest.raises(RuntimeError):
+        client.chat("lost", stream=False)
+    client.chat("q2", stream=False)
+    assert _sent_messages(server) == [("user", "q1"), ("assistant", "echo:q1"), ("user", "q2")]
+
+
+def test_negative_max_history_turns_is_rejected():
+    with pytest.raises(ValueError):
+        llm.LLMClient(max_history_turns=-1)